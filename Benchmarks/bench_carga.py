@@ -0,0 +1,199 @@
+"""Teste de carga ponta a ponta das Cloud Functions, com dependências falsas.
+
+Uso: python Benchmarks/bench_carga.py [--requisicoes 2000] [--usuarios 200] [--concorrencia 8]
+                                      [--webhook texto|audio] [--latencia dialogflow=0.03 ...]
+                                      [--saida resultado.json] [--comparar base.json]
+
+Reproduz os payloads de Benchmarks/payloads.json (envelopes do WhatsApp e
+exemplos dos contratos em "OpenAPI Usados") contra registrar_criterios_busca,
+get_info e whatsapp_webhook, trocando usuário e IDs a cada requisição.
+Firestore, BigQuery, Dialogflow, Speech e Graph API são os dublês de
+fakes.py, com a latência de LATENCIAS_PADRAO (ou --latencia).
+
+Para cada função mostra p50/p99, vazão e as chamadas feitas a cada
+dependência. Com --comparar, sai com código 1 se algum p99 piorou mais que
+--tolerancia em relação ao resultado salvo antes com --saida.
+"""
+import os
+import sys
+import copy
+import json
+import time
+import argparse
+import tempfile
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import fakes
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FUNCOES = os.path.join(RAIZ, "Webhooks_Rodando")
+ARQUIVOS_WEBHOOK = {"texto": "WPP-FS-DCX.PY", "audio": "AudioWPP.PY"}
+LATENCIAS_PADRAO = {"firestore": 0.005, "bigquery": 0.05, "dialogflow": 0.03, "graph_api": 0.02, "speech": 0.3}
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))] if ordenados else 0.0
+
+def executar(nome, handler, requisicoes, concorrencia):
+    """Dispara as requisições com `concorrencia` threads e mede cada uma."""
+    antes = Counter(fakes.chamadas)
+
+    def chamar(requisicao):
+        inicio = time.perf_counter()
+        resposta = handler(requisicao)
+        return (time.perf_counter() - inicio) * 1000, resposta[1] if isinstance(resposta, tuple) else 200
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        medicoes = list(executor.map(chamar, requisicoes))
+    duracao = time.perf_counter() - inicio
+
+    tempos = [tempo for tempo, _ in medicoes]
+    chamadas = {k: v - antes[k] for k, v in sorted(fakes.chamadas.items()) if v - antes[k]}
+    return {
+        "funcao": nome,
+        "requisicoes": len(requisicoes),
+        "p50_ms": round(percentil(tempos, 50), 3),
+        "p99_ms": round(percentil(tempos, 99), 3),
+        "vazao_rps": round(len(requisicoes) / duracao, 1),
+        "status": dict(Counter(status for _, status in medicoes)),
+        "chamadas": chamadas,
+    }
+
+def modelos(payloads, chave, total):
+    """Repete os payloads gravados até `total`, na ordem do arquivo."""
+    return [copy.deepcopy(payloads[chave][i % len(payloads[chave])]) for i in range(total)]
+
+def requisicoes_criterios(payloads, total, usuarios):
+    requisicoes = []
+    for i, corpo in enumerate(modelos(payloads, "registrar_criterios_busca", total)):
+        corpo["dialogflowSessionId"] = f"USR{i % usuarios:05d}"
+        requisicoes.append(fakes.Requisicao("POST", json=corpo))
+    return requisicoes
+
+def requisicoes_get_info(total, usuarios):
+    return [fakes.Requisicao("GET", args={"user_code": f"USR{i % usuarios:05d}"}) for i in range(total)]
+
+def requisicoes_webhook(payloads, chave, total, usuarios):
+    requisicoes = []
+    for i, envelope in enumerate(modelos(payloads, chave, total)):
+        remetente = f"55119{i % usuarios:08d}"
+        for entry in envelope["entry"]:
+            for change in entry["changes"]:
+                for message in change["value"].get("messages", []):
+                    message["from"] = remetente
+                    message["id"] = f"wamid.bench.{i}"
+                    if "audio" in message:
+                        message["audio"]["id"] = f"media.bench.{i}"
+                for status in change["value"].get("statuses", []):
+                    status["recipient_id"] = remetente
+        requisicoes.append(fakes.Requisicao("POST", json=envelope))
+    return requisicoes
+
+def aguardar_fila(funcao, limite_segundos=120):
+    """Espera o pipeline do webhook responder tudo o que entrou na fila local."""
+    inicio = time.perf_counter()
+    conexao = funcao["abrir_fila"]()
+    while time.perf_counter() - inicio < limite_segundos:
+        with funcao["_fila_lock"]:
+            abertas = conexao.execute(f"SELECT COUNT(*) FROM fila WHERE status IN ({funcao['FILA_PENDENTE']}, {funcao['FILA_EM_ANDAMENTO']})").fetchone()[0]
+        if not abertas:
+            break
+        time.sleep(0.05)
+    return round(time.perf_counter() - inicio, 2)
+
+def imprimir(resultado):
+    print(f"\n▶ {resultado['funcao']}: {resultado['requisicoes']} requisições")
+    print(f"  p50 {resultado['p50_ms']:.3f} ms | p99 {resultado['p99_ms']:.3f} ms | {resultado['vazao_rps']} req/s | status {resultado['status']}")
+    for dependencia, quantidade in resultado["chamadas"].items():
+        print(f"  {dependencia:<32} {quantidade:>7}  ({quantidade / resultado['requisicoes']:.2f}/req)")
+    for chave in ("pipeline", "rastros"):
+        if chave in resultado:
+            print(f"  {chave}: {json.dumps(resultado[chave], ensure_ascii=False, default=str)}")
+
+def comparar(resultados, caminho, tolerancia):
+    """Compara o p99 de cada função com o de um resultado anterior."""
+    with open(caminho, encoding="utf-8") as arquivo:
+        base = {r["funcao"]: r for r in json.load(arquivo)}
+    regressoes = 0
+    for resultado in resultados:
+        anterior = base.get(resultado["funcao"])
+        if anterior and resultado["p99_ms"] > anterior["p99_ms"] * (1 + tolerancia):
+            print(f"⚠️ {resultado['funcao']}: p99 {anterior['p99_ms']} → {resultado['p99_ms']} ms")
+            regressoes += 1
+    return regressoes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requisicoes", type=int, default=2000)
+    parser.add_argument("--usuarios", type=int, default=200)
+    parser.add_argument("--concorrencia", type=int, default=8)
+    parser.add_argument("--imoveis", type=int, default=20000)
+    parser.add_argument("--webhook", choices=ARQUIVOS_WEBHOOK, default="texto")
+    parser.add_argument("--latencia", nargs="*", default=[], metavar="DEPENDENCIA=SEGUNDOS")
+    parser.add_argument("--saida", help="Grava os resultados em JSON")
+    parser.add_argument("--comparar", help="Resultado JSON anterior para detectar regressões")
+    parser.add_argument("--tolerancia", type=float, default=0.2)
+    args = parser.parse_args()
+
+    fakes.LATENCIAS.update(LATENCIAS_PADRAO)
+    for item in args.latencia:
+        dependencia, segundos = item.split("=")
+        fakes.LATENCIAS[dependencia] = float(segundos)
+
+    # Configuração das funções: fila local descartável, sem amostragem de logs e sem descartes do rate limit
+    os.environ.setdefault("FILA_LOCAL_PATH", os.path.join(tempfile.mkdtemp(), "fila.db"))
+    os.environ.setdefault("TRACE_SAMPLE_RATE", "0")
+    os.environ.setdefault("RATE_LIMIT_RAJADA", "1000")
+    os.environ.setdefault("JANELA_SILENCIO_SEGUNDOS", "0.2")
+
+    fakes.instalar()
+    fakes.IMOVEIS[:] = fakes.gerar_imoveis(args.imoveis)
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "payloads.json"), encoding="utf-8") as arquivo:
+        payloads = json.load(arquivo)
+
+    preferencias = fakes.carregar(os.path.join(FUNCOES, "(Preferences)DCX-FS.PY"), "preferencias")
+    imoveis = fakes.carregar(os.path.join(FUNCOES, "DCX-DB-DCX.PY"), "imoveis")
+    webhook = fakes.carregar(os.path.join(FUNCOES, ARQUIVOS_WEBHOOK[args.webhook]), "webhook")
+
+    # Aquecimento: índice de imóveis carregado e event loop do webhook iniciado antes de medir
+    while imoveis["obter_indice"]() is None:
+        time.sleep(0.1)
+    webhook["obter_loop"]()
+
+    resultados = []
+    resultado = executar("registrar_criterios_busca", preferencias["registrar_criterios_busca"],
+                         requisicoes_criterios(payloads, args.requisicoes, args.usuarios), args.concorrencia)
+    resultado["rastros"] = preferencias["metricas_rastros"]()
+    resultados.append(resultado)
+
+    resultado = executar("get_info", imoveis["get_info"],
+                         requisicoes_get_info(args.requisicoes, args.usuarios), args.concorrencia)
+    resultado["rastros"] = imoveis["metricas_rastros"]()
+    resultados.append(resultado)
+
+    chave = "whatsapp_webhook_audio" if args.webhook == "audio" else "whatsapp_webhook"
+    antes = Counter(fakes.chamadas)
+    resultado = executar("whatsapp_webhook", webhook["whatsapp_webhook"],
+                         requisicoes_webhook(payloads, chave, args.requisicoes, args.usuarios), args.concorrencia)
+    # O webhook só enfileira; a resposta ao usuário sai do pipeline assíncrono
+    drenagem = aguardar_fila(webhook)
+    webhook["descarregar_escritas_pendentes"]()
+    resultado["chamadas"] = {k: v - antes[k] for k, v in sorted(fakes.chamadas.items()) if v - antes[k]}
+    resultado["pipeline"] = {"drenagem_s": drenagem, "respostas": len(fakes.MENSAGENS_ENVIADAS), **webhook["metricas_debounce"]()}
+    resultado["rastros"] = webhook["metricas_rastros"]()
+    resultados.append(resultado)
+
+    for resultado in resultados:
+        imprimir(resultado)
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(resultados, arquivo, ensure_ascii=False, indent=2, default=str)
+    if args.comparar and comparar(resultados, args.comparar, args.tolerancia):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Benchmark do get_info com muitos imóveis vistos pelo mesmo usuário.
+
+Uso: python Benchmarks/bench_vistos.py [--visualizacoes 10000] [--imoveis 50000]
+
+Mede, a cada janela de visualizações, p50 e p99 com a sessão em cache (mesma
+instância), p50 e p99 com a sessão fria (instância nova, que só conhece o
+documento) e o tamanho do documento do usuário no Firestore. Os números
+devem ficar estáveis conforme os vistos crescem.
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import fakes
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PREFERENCIAS = {
+    "transactionType": "Venda",
+    "location": {"neighborhood": "Bairro 7"},
+    "price": {"valorMin": 0, "valorMax": 0},
+    "features": ["Piscina"],
+}
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))]
+
+def chamar(funcao, requisicao):
+    inicio = time.perf_counter()
+    _, status, *_ = funcao["get_info"](requisicao)
+    return (time.perf_counter() - inicio) * 1000, status
+
+def medir(funcao, usuario, visualizacoes, janela, amostras_frias):
+    fakes.DOCUMENTOS[f"messages/{usuario}"] = {"preferences": PREFERENCIAS}
+    requisicao = fakes.Requisicao("GET", args={"user_code": usuario})
+    tempos = []
+    print(f"{'vistos':>8} {'p50 ms':>8} {'p99 ms':>8} {'fria p50':>9} {'fria p99':>9} {'doc KB':>8}")
+    for i in range(1, visualizacoes + 1):
+        tempo, status = chamar(funcao, requisicao)
+        tempos.append(tempo)
+        if status != 200:
+            print(f"⚠️ Sem imóveis após {i - 1} visualizações")
+            break
+        if i % janela == 0:
+            # Sessão fria: a instância só conhece o Bloom gravado no documento
+            frios = []
+            for _ in range(amostras_frias):
+                funcao["_sessoes"].clear()
+                frios.append(chamar(funcao, requisicao)[0])
+            documento = fakes.DOCUMENTOS[f"messages/{usuario}"]
+            tamanho = sum(
+                sum(map(len, v.values())) if k == "imoveis_vistos_bloom" else len(v) if isinstance(v, bytes) else len(str(v))
+                for k, v in documento.items()
+            )
+            print(f"{i:>8} {statistics.median(tempos):>8.3f} {percentil(tempos, 99):>8.3f} "
+                  f"{statistics.median(frios):>9.3f} {percentil(frios, 99):>9.3f} {tamanho / 1024:>8.1f}")
+            tempos = []
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--visualizacoes", type=int, default=10000)
+    parser.add_argument("--imoveis", type=int, default=50000)
+    parser.add_argument("--janela", type=int, default=1000)
+    parser.add_argument("--amostras-frias", type=int, default=20)
+    args = parser.parse_args()
+
+    os.environ.setdefault("TRACE_SAMPLE_RATE", "0")
+    fakes.instalar()
+    fakes.IMOVEIS[:] = fakes.gerar_imoveis(args.imoveis)
+    funcao = fakes.carregar(os.path.join(RAIZ, "Webhooks_Rodando", "DCX-DB-DCX.PY"))
+    while funcao["obter_indice"]() is None:
+        time.sleep(0.1)
+
+    medir(funcao, "bench", args.visualizacoes, args.janela, args.amostras_frias)
+    print("\nChamadas:", dict(fakes.chamadas))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,381 @@
+"""Dublês locais de Firestore, BigQuery, Dialogflow CX, Speech e Graph API para os benchmarks.
+
+`instalar()` registra os módulos falsos em sys.modules antes de carregar as
+Cloud Functions com `carregar()`. Cada chamada externa é contada em `chamadas`
+e pode ter uma latência simulada em `LATENCIAS` (segundos).
+"""
+import sys
+import time
+import types
+import random
+import asyncio
+from collections import Counter
+
+chamadas = Counter()
+LATENCIAS = {
+    "firestore": 0.0,
+    "bigquery": 0.0,
+    "dialogflow": 0.0,
+    "graph_api": 0.0,
+    "speech": 0.0,
+}
+DOCUMENTOS = {}
+IMOVEIS = []
+MENSAGENS_ENVIADAS = []
+
+def _chamar(dependencia, operacao):
+    chamadas[f"{dependencia}.{operacao}"] += 1
+    if LATENCIAS[dependencia]:
+        time.sleep(LATENCIAS[dependencia])
+
+async def _chamar_async(dependencia, operacao):
+    chamadas[f"{dependencia}.{operacao}"] += 1
+    await asyncio.sleep(LATENCIAS[dependencia])
+
+# ---------------------------------------------------------------- Firestore
+
+class AlreadyExists(Exception):
+    pass
+
+class Increment:
+    def __init__(self, valor):
+        self.valor = valor
+
+class ArrayUnion:
+    def __init__(self, values):
+        self.values = list(values)
+
+def _mesclar(atual, dados):
+    for campo, valor in dados.items():
+        if isinstance(valor, Increment):
+            atual[campo] = atual.get(campo, 0) + valor.valor
+        elif isinstance(valor, ArrayUnion):
+            existentes = list(atual.get(campo) or [])
+            atual[campo] = existentes + [v for v in valor.values if v not in existentes]
+        elif isinstance(valor, dict) and isinstance(atual.get(campo), dict):
+            # Como o merge do Firestore: mapas aninhados só têm as chaves enviadas substituídas
+            atual[campo] = dict(atual[campo])
+            _mesclar(atual[campo], valor)
+        else:
+            atual[campo] = valor
+
+class Snapshot:
+    def __init__(self, referencia, dados):
+        self.reference = referencia
+        self.id = referencia.id
+        self.exists = dados is not None
+        self._dados = dados
+
+    def to_dict(self):
+        return dict(self._dados) if self._dados is not None else None
+
+class Documento:
+    def __init__(self, caminho):
+        self.caminho = self.path = caminho
+        self.id = caminho.rsplit("/", 1)[-1]
+
+    def collection(self, nome):
+        return Colecao(f"{self.caminho}/{nome}")
+
+    def get(self, transaction=None):
+        _chamar("firestore", "get")
+        return Snapshot(self, DOCUMENTOS.get(self.caminho))
+
+    def set(self, dados, merge=False):
+        _chamar("firestore", "set")
+        atual = DOCUMENTOS.setdefault(self.caminho, {}) if merge else {}
+        _mesclar(atual, dados)
+        DOCUMENTOS[self.caminho] = atual
+
+    def update(self, dados):
+        _chamar("firestore", "update")
+        _mesclar(DOCUMENTOS.setdefault(self.caminho, {}), dados)
+
+    def delete(self):
+        _chamar("firestore", "delete")
+        DOCUMENTOS.pop(self.caminho, None)
+
+    def create(self, dados):
+        _chamar("firestore", "create")
+        if self.caminho in DOCUMENTOS:
+            raise AlreadyExists(self.caminho)
+        DOCUMENTOS[self.caminho] = dict(dados)
+
+class Colecao:
+    def __init__(self, caminho):
+        self.caminho = caminho
+
+    def document(self, documento_id):
+        return Documento(f"{self.caminho}/{documento_id}")
+
+class Lote:
+    def __init__(self):
+        self.operacoes = []
+
+    def set(self, referencia, dados, merge=False):
+        self.operacoes.append((referencia, dados, merge))
+
+    def commit(self):
+        _chamar("firestore", "commit")
+        for referencia, dados, merge in self.operacoes:
+            atual = DOCUMENTOS.setdefault(referencia.caminho, {}) if merge else {}
+            _mesclar(atual, dados)
+            DOCUMENTOS[referencia.caminho] = atual
+
+class Transacao:
+    """Aplica as escritas no fim; as threads dos benchmarks não disputam o mesmo documento na transação."""
+
+    def __init__(self):
+        self.operacoes = []
+
+    def update(self, referencia, dados):
+        self.operacoes.append((referencia, dados))
+
+def transactional(funcao):
+    def executar(transacao, *args, **kwargs):
+        resultado = funcao(transacao, *args, **kwargs)
+        _chamar("firestore", "commit")
+        for referencia, dados in transacao.operacoes:
+            _mesclar(DOCUMENTOS.setdefault(referencia.caminho, {}), dados)
+        return resultado
+    return executar
+
+class FirestoreClient:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def collection(self, nome):
+        return Colecao(nome)
+
+    def batch(self):
+        return Lote()
+
+    def transaction(self):
+        return Transacao()
+
+    def get_all(self, referencias):
+        _chamar("firestore", "get_all")
+        return [Snapshot(r, DOCUMENTOS.get(r.caminho)) for r in referencias]
+
+# ----------------------------------------------------------------- BigQuery
+
+class ConsultaBigQuery:
+    def __init__(self, linhas):
+        self._linhas = linhas
+
+    def result(self):
+        return iter(self._linhas)
+
+class BigQueryClient:
+    """Responde à carga do índice com todos os imóveis e às demais consultas com a página `offset`/`limite`."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def query(self, query, job_config=None):
+        _chamar("bigquery", "query")
+        parametros = {p.name: p.value for p in getattr(job_config, "query_parameters", [])}
+        excluidos = set(parametros.get("exclude_ids", ()))
+        linhas = [linha for linha in IMOVEIS if linha["ListingID"] not in excluidos]
+        if "limite" in parametros:
+            offset = parametros.get("offset", 0)
+            linhas = linhas[offset:offset + parametros["limite"]]
+        return ConsultaBigQuery(linhas)
+
+class Parametro:
+    def __init__(self, name, tipo, value):
+        self.name, self.tipo, self.value = name, tipo, value
+
+def gerar_imoveis(total, semente=42):
+    """Imóveis sintéticos com as colunas usadas pelo índice do get_info."""
+    sorteio = random.Random(semente)
+    cidades = ["São Paulo", "Campinas", "Santos", "Rio de Janeiro", "Belo Horizonte"]
+    bairros = [f"Bairro {i}" for i in range(60)]
+    tipos = ["Apartamento", "Casa", "Casa de Condomínio", "Cobertura", "Studio"]
+    features = ["Piscina", "Churrasqueira", "Academia", "Varanda", "Portaria 24h", "Elevador"]
+    imoveis = []
+    for i in range(total):
+        venda = sorteio.random() < 0.6
+        imoveis.append({
+            "ListingID": f"L{i:07d}",
+            "Title": f"Imóvel {i}",
+            "TransactionType": "Venda" if venda else "Aluguel",
+            "PropertyType": sorteio.choice(tipos),
+            "UsageType": "Residencial",
+            "State": "SP",
+            "City": sorteio.choice(cidades),
+            "Neighborhood": sorteio.choice(bairros),
+            "Zone": sorteio.choice(["Norte", "Sul", "Leste", "Oeste", "Centro"]),
+            "Features": ", ".join(sorteio.sample(features, 3)),
+            "ListPrice": round(sorteio.uniform(150_000, 3_000_000), 2) if venda else 0.0,
+            "RentalPrice": 0.0 if venda else round(sorteio.uniform(800, 15_000), 2),
+            "LivingArea": round(sorteio.uniform(25, 400), 1),
+            "LotArea": round(sorteio.uniform(0, 800), 1),
+            "Bedrooms": sorteio.randint(0, 5),
+            "Bathrooms": sorteio.randint(1, 4),
+            "GarageSpaces": sorteio.randint(0, 4),
+        })
+    return imoveis
+
+# ------------------------------------------------------- Dialogflow / Speech
+
+class SessionsAsyncClient:
+    def __init__(self, *args, **kwargs):
+        chamadas["dialogflow.cliente"] += 1
+
+    @staticmethod
+    def session_path(project, location, agent, session):
+        return f"projects/{project}/locations/{location}/agents/{agent}/sessions/{session}"
+
+    async def detect_intent(self, request):
+        await _chamar_async("dialogflow", "detect_intent")
+        texto = types.SimpleNamespace(text=[f"Resposta para: {request.query_input.text.text}"])
+        mensagem = types.SimpleNamespace(text=texto)
+        return types.SimpleNamespace(query_result=types.SimpleNamespace(response_messages=[mensagem]))
+
+class SpeechClient:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def recognize(self, config=None, audio=None):
+        _chamar("speech", "recognize")
+        alternativa = types.SimpleNamespace(transcript="mensagem de voz")
+        return types.SimpleNamespace(results=[types.SimpleNamespace(alternatives=[alternativa], is_final=True)])
+
+    def streaming_recognize(self, config=None, requests=()):
+        for _ in requests:
+            pass
+        _chamar("speech", "streaming_recognize")
+        alternativa = types.SimpleNamespace(transcript="mensagem de voz")
+        yield types.SimpleNamespace(results=[types.SimpleNamespace(alternatives=[alternativa], is_final=True)])
+
+# ---------------------------------------------------------------- Graph API
+
+class RespostaHttp:
+    def __init__(self, status_code=200, dados=None):
+        self.status_code = status_code
+        self._dados = dados or {}
+        self.text = str(self._dados)
+
+    def json(self):
+        return self._dados
+
+    def raise_for_status(self):
+        pass
+
+class StreamHttp:
+    def __init__(self, tamanho):
+        self.tamanho = tamanho
+
+    async def __aenter__(self):
+        await _chamar_async("graph_api", "stream")
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    def raise_for_status(self):
+        pass
+
+    async def aiter_bytes(self, tamanho_bloco):
+        restante = self.tamanho
+        while restante > 0:
+            bloco = min(tamanho_bloco, restante)
+            restante -= bloco
+            yield b"\0" * bloco
+
+class HttpxAsyncClient:
+    def __init__(self, *args, **kwargs):
+        chamadas["graph_api.cliente"] += 1
+
+    async def post(self, url, json=None, headers=None):
+        await _chamar_async("graph_api", "post")
+        MENSAGENS_ENVIADAS.append(json)
+        return RespostaHttp(200, {"messages": [{"id": "wamid.resposta"}]})
+
+    async def get(self, url, headers=None):
+        await _chamar_async("graph_api", "get")
+        return RespostaHttp(200, {"url": f"https://midia.local/{url.rsplit('/', 1)[-1]}"})
+
+    def stream(self, metodo, url, headers=None):
+        return StreamHttp(50_000)
+
+# ------------------------------------------------------------ Flask / HTTP
+
+class Requisicao:
+    """O mínimo de flask.Request usado pelas funções."""
+
+    def __init__(self, method="POST", json=None, args=None):
+        self.method = method
+        self._json = json
+        self.args = args or {}
+
+    def get_json(self, silent=False, force=False):
+        return self._json
+
+def instalar():
+    """Registra os módulos falsos no lugar das bibliotecas do Google, httpx, flask e functions_framework."""
+    ns = types.SimpleNamespace
+
+    google = types.ModuleType("google")
+    cloud = types.ModuleType("google.cloud")
+    api_core = types.ModuleType("google.api_core")
+    excecoes = types.ModuleType("google.api_core.exceptions")
+    google.cloud, google.api_core, api_core.exceptions = cloud, api_core, excecoes
+    excecoes.AlreadyExists = AlreadyExists
+
+    cloud.firestore = ns(Client=FirestoreClient, SERVER_TIMESTAMP="SERVER_TIMESTAMP",
+                         ArrayUnion=ArrayUnion, Increment=Increment,
+                         transactional=transactional)
+    cloud.bigquery = ns(
+        Client=BigQueryClient,
+        QueryJobConfig=lambda query_parameters=(): ns(query_parameters=list(query_parameters)),
+        ScalarQueryParameter=Parametro,
+        ArrayQueryParameter=Parametro,
+    )
+    cloud.dialogflowcx_v3beta1 = ns(
+        SessionsAsyncClient=SessionsAsyncClient,
+        TextInput=lambda text: ns(text=text),
+        QueryInput=lambda text, language_code: ns(text=text, language_code=language_code),
+        DetectIntentRequest=lambda session, query_input: ns(session=session, query_input=query_input),
+    )
+    cloud.speech = ns(
+        SpeechClient=SpeechClient,
+        RecognitionConfig=type("RecognitionConfig", (), {
+            "AudioEncoding": ns(OGG_OPUS=1),
+            "__init__": lambda self, **kwargs: self.__dict__.update(kwargs),
+        }),
+        RecognitionAudio=lambda content: ns(content=content),
+        StreamingRecognitionConfig=lambda config, **kwargs: ns(config=config),
+        StreamingRecognizeRequest=lambda audio_content: ns(audio_content=audio_content),
+    )
+
+    httpx = types.ModuleType("httpx")
+    httpx.AsyncClient = HttpxAsyncClient
+    httpx.Limits = lambda **kwargs: None
+    httpx.Timeout = lambda *args, **kwargs: None
+
+    flask = types.ModuleType("flask")
+    flask.Request = Requisicao
+    flask.request = None
+    flask.jsonify = lambda *args, **kwargs: args[0] if args else kwargs
+    flask.make_response = lambda corpo, status=200: (corpo, status)
+
+    sys.modules.update({
+        "google": google,
+        "google.cloud": cloud,
+        "google.cloud.firestore": cloud.firestore,
+        "google.cloud.bigquery": cloud.bigquery,
+        "google.api_core": api_core,
+        "google.api_core.exceptions": excecoes,
+        "functions_framework": ns(http=lambda funcao: funcao),
+        "httpx": httpx,
+        "flask": flask,
+    })
+
+def carregar(caminho, nome="funcao"):
+    """Executa o arquivo de uma Cloud Function e devolve o namespace do módulo."""
+    namespace = {"__name__": nome, "__file__": caminho}
+    with open(caminho, encoding="utf-8") as arquivo:
+        exec(compile(arquivo.read(), caminho, "exec"), namespace)
+    return namespace
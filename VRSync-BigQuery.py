@@ -0,0 +1,328 @@
+import os
+import glob
+import json
+import hashlib
+import argparse
+import xml.etree.ElementTree as ET
+
+# Tabela consultada pelo get_info (DCX-DB-DCX.PY)
+BIGQUERY_TABLE = "helena-452318.imoveis.listing"
+BIGQUERY_STAGING_TABLE = "helena-452318.imoveis.listing_staging"
+
+# Quantidade de imóveis por arquivo NDJSON / load job
+TAMANHO_LOTE = 5000
+
+# Arquivos gravados na pasta de saída a cada execução
+PADRAO_ARQUIVOS_LOTE = "listing-*.ndjson"
+ARQUIVO_REMOVIDOS = "removidos.ndjson"
+
+# ListingIDs duplicados mostrados no erro que rejeita o feed
+MAX_DUPLICADOS_EXIBIDOS = 20
+
+# Colunas da tabela, na mesma ordem do exemplo em Webhooks_Rodando/python.py
+COLUNAS_TEXTO = [
+    "ListingID", "Title", "TransactionType", "PropertyType", "UsageType",
+    "Country", "State", "City", "Zone", "Neighborhood", "Address",
+    "StreetNumber", "Complement", "PostalCode", "ContactInfo",
+    "PublicationType", "ConstructionStatus", "Description", "Features",
+    "Warranties",
+]
+COLUNAS_DECIMAIS = [
+    "ListPrice", "Iptu", "RentalPrice", "PropertyAdministrationFee",
+    "LivingArea", "LotArea",
+]
+COLUNAS_INTEIRAS = [
+    "Media", "Bedrooms", "Bathrooms", "GarageSpaces", "ParkingSpaces",
+    "Floors", "UnitFloor", "Buildings", "YearBuilt",
+]
+
+# Valores do VRSync traduzidos para os usados na tabela
+TIPOS_TRANSACAO = {
+    "For Sale": "Venda",
+    "For Rent": "Aluguel",
+    "Sale/Rent": "Venda e Aluguel",
+}
+TIPOS_USO = {
+    "Residential": "Residencial",
+    "Commercial": "Comercial",
+    "Residential / Commercial": "Residencial / Comercial",
+}
+TIPOS_IMOVEL = {
+    "Apartment": "Apartamento",
+    "Home": "Casa",
+    "Home residencial": "Casa",
+    "Condo": "Casa de Condomínio",
+    "Penthouse": "Cobertura",
+    "Flat": "Flat",
+    "Kitnet": "Kitnet",
+    "Studio": "Studio",
+    "Land Lot": "Terreno",
+    "Farm Ranch": "Fazenda / Sítio",
+    "Office": "Sala Comercial",
+    "Business": "Ponto Comercial",
+    "Warehouse": "Galpão",
+}
+
+def _nome(tag):
+    """Remove o namespace do VRSync de uma tag."""
+    return tag.rsplit("}", 1)[-1]
+
+def _filhos(elem):
+    """Indexa os filhos diretos de um elemento pelo nome da tag."""
+    return {_nome(filho.tag): filho for filho in elem} if elem is not None else {}
+
+def _texto(elem):
+    if elem is None or elem.text is None:
+        return ""
+    return elem.text.strip()
+
+def _numero(elem, tipo):
+    texto = _texto(elem).replace(",", ".")
+    try:
+        return tipo(float(texto)) if texto else 0
+    except ValueError:
+        return 0
+
+def mapear_listing(listing):
+    """Converte um <Listing> do VRSync para uma linha da tabela imoveis.listing."""
+    campos = _filhos(listing)
+    detalhes = _filhos(campos.get("Details"))
+    local = _filhos(campos.get("Location"))
+    contato = _filhos(campos.get("ContactInfo"))
+
+    tipo_imovel = _texto(detalhes.get("PropertyType")).split("/")[-1].strip()
+    features = [_texto(f) for f in detalhes.get("Features", [])]
+    garantias = [_texto(g) for g in detalhes.get("Warranties", [])]
+
+    linha = {coluna: "" for coluna in COLUNAS_TEXTO}
+    linha.update({
+        "ListingID": _texto(campos.get("ListingID")),
+        "Title": _texto(campos.get("Title")),
+        "TransactionType": TIPOS_TRANSACAO.get(_texto(campos.get("TransactionType")), _texto(campos.get("TransactionType"))),
+        "PropertyType": TIPOS_IMOVEL.get(tipo_imovel, tipo_imovel),
+        "UsageType": TIPOS_USO.get(_texto(detalhes.get("UsageType")), _texto(detalhes.get("UsageType"))),
+        "Country": _texto(local.get("Country")),
+        "State": local["State"].get("abbreviation", _texto(local["State"])) if "State" in local else "",
+        "City": _texto(local.get("City")),
+        "Zone": _texto(local.get("Zone")),
+        "Neighborhood": _texto(local.get("Neighborhood")),
+        "Address": _texto(local.get("Address")),
+        "StreetNumber": _texto(local.get("StreetNumber")),
+        "Complement": _texto(local.get("Complement")),
+        "PostalCode": _texto(local.get("PostalCode")),
+        "ContactInfo": _texto(contato.get("Email")),
+        "PublicationType": _texto(campos.get("PublicationType")),
+        "ConstructionStatus": _texto(detalhes.get("ConstructionStatus")),
+        "Description": _texto(detalhes.get("Description")),
+        "Features": ", ".join(f for f in features if f),
+        "Warranties": ", ".join(g for g in garantias if g),
+    })
+
+    for coluna in COLUNAS_DECIMAIS:
+        linha[coluna] = _numero(detalhes.get(coluna), float)
+    for coluna in COLUNAS_INTEIRAS:
+        linha[coluna] = _numero(detalhes.get(coluna), int)
+
+    linha["Media"] = len(campos.get("Media", []))
+    linha["GarageSpaces"] = _numero(detalhes.get("Garage"), int)
+    return linha
+
+def ler_listings(caminho_xml):
+    """Percorre o feed de forma incremental, devolvendo uma linha por <Listing>.
+
+    Cada <Listing> é descartado da árvore assim que é convertido, então o
+    consumo de memória não depende do tamanho do feed.
+    """
+    pai = None
+    for evento, elem in ET.iterparse(caminho_xml, events=("start", "end")):
+        nome = _nome(elem.tag)
+        if evento == "start":
+            if nome == "Listings":
+                pai = elem
+            continue
+
+        if nome == "Listing":
+            linha = mapear_listing(elem)
+            elem.clear()
+            if pai is not None:
+                pai.clear()
+            if linha["ListingID"]:
+                yield linha
+
+def hash_linha(linha):
+    """Hash do conteúdo de um imóvel, usado para detectar alterações no modo delta."""
+    conteudo = json.dumps(linha, sort_keys=True, ensure_ascii=False)
+    return hashlib.blake2b(conteudo.encode("utf-8"), digest_size=16).hexdigest()
+
+def filtrar_alterados(linhas, estado_anterior, estado_novo, delta=True, duplicados=None):
+    """Registra o hash de cada imóvel e, no modo delta, só repassa os alterados.
+
+    Um ListingID repetido no feed não é repassado; ele vai para `duplicados`.
+    """
+    for linha in linhas:
+        listing_id = linha["ListingID"]
+        if listing_id in estado_novo:
+            if duplicados is not None:
+                duplicados.append(listing_id)
+            continue
+        novo_hash = hash_linha(linha)
+        estado_novo[listing_id] = novo_hash
+        if not delta or estado_anterior.get(listing_id) != novo_hash:
+            yield linha
+
+def carregar_estado(caminho):
+    if not caminho or not os.path.exists(caminho):
+        return {}
+    with open(caminho, encoding="utf-8") as arquivo:
+        return json.load(arquivo)
+
+def salvar_estado(caminho, estado):
+    """Grava o estado de forma atômica para não corromper o delta em caso de falha."""
+    temporario = f"{caminho}.tmp"
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        json.dump(estado, arquivo, ensure_ascii=False)
+    os.replace(temporario, caminho)
+
+def limpar_saida(pasta):
+    """Remove os lotes e a lista de removidos de uma execução anterior."""
+    os.makedirs(pasta, exist_ok=True)
+    for caminho in glob.glob(os.path.join(pasta, PADRAO_ARQUIVOS_LOTE)) + [os.path.join(pasta, ARQUIVO_REMOVIDOS)]:
+        if os.path.exists(caminho):
+            os.remove(caminho)
+
+def gravar_ndjson(linhas, pasta, tamanho_lote=TAMANHO_LOTE):
+    """Grava as linhas em arquivos NDJSON de até `tamanho_lote` imóveis cada.
+
+    Os lotes da execução anterior são apagados antes, para que a pasta só
+    tenha os arquivos desta carga.
+    """
+    limpar_saida(pasta)
+    arquivos = []
+    arquivo = None
+    total = 0
+
+    try:
+        for linha in linhas:
+            if total % tamanho_lote == 0:
+                if arquivo:
+                    arquivo.close()
+                caminho = os.path.join(pasta, f"listing-{len(arquivos):05d}.ndjson")
+                arquivo = open(caminho, "w", encoding="utf-8")
+                arquivos.append(caminho)
+            arquivo.write(json.dumps(linha, ensure_ascii=False) + "\n")
+            total += 1
+    finally:
+        if arquivo:
+            arquivo.close()
+
+    return arquivos, total
+
+def gravar_removidos(removidos, pasta):
+    """Grava os ListingIDs que saíram do feed, um por linha, ao lado dos lotes."""
+    caminho = os.path.join(pasta, ARQUIVO_REMOVIDOS)
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        for listing_id in removidos:
+            arquivo.write(json.dumps({"ListingID": listing_id}, ensure_ascii=False) + "\n")
+    return caminho
+
+def carregar_bigquery(arquivos, removidos, delta):
+    """Envia os arquivos NDJSON em load jobs (nada de inserts linha a linha).
+
+    Os arquivos sempre vão primeiro para a tabela de staging. No modo completo
+    ela substitui a tabela principal num único copy job (WRITE_TRUNCATE é
+    atômico), então o get_info nunca lê uma tabela carregada pela metade. No
+    modo delta ela entra na tabela principal com um MERGE por ListingID.
+    """
+    from google.cloud import bigquery
+
+    bq_client = bigquery.Client()
+    schema = (
+        [bigquery.SchemaField(c, "STRING") for c in COLUNAS_TEXTO]
+        + [bigquery.SchemaField(c, "FLOAT") for c in COLUNAS_DECIMAIS]
+        + [bigquery.SchemaField(c, "INTEGER") for c in COLUNAS_INTEIRAS]
+    )
+    destino = BIGQUERY_STAGING_TABLE
+
+    for indice, caminho in enumerate(arquivos):
+        job_config = bigquery.LoadJobConfig(
+            source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
+            write_disposition="WRITE_TRUNCATE" if indice == 0 else "WRITE_APPEND",
+            schema=schema,
+        )
+        with open(caminho, "rb") as arquivo:
+            bq_client.load_table_from_file(arquivo, destino, job_config=job_config).result()
+        print(f"📦 Lote {caminho} carregado em {destino}")
+
+    if not delta:
+        if arquivos:
+            job_config = bigquery.CopyJobConfig(write_disposition="WRITE_TRUNCATE")
+            bq_client.copy_table(BIGQUERY_STAGING_TABLE, BIGQUERY_TABLE, job_config=job_config).result()
+            print(f"🔁 {BIGQUERY_TABLE} substituída pela carga completa")
+        return
+
+    colunas = COLUNAS_TEXTO + COLUNAS_DECIMAIS + COLUNAS_INTEIRAS
+    if arquivos:
+        atualizacao = ", ".join(f"T.{c} = S.{c}" for c in colunas if c != "ListingID")
+        bq_client.query(f'''
+        MERGE `{BIGQUERY_TABLE}` T
+        USING `{BIGQUERY_STAGING_TABLE}` S
+        ON T.ListingID = S.ListingID
+        WHEN MATCHED THEN UPDATE SET {atualizacao}
+        WHEN NOT MATCHED THEN INSERT ({", ".join(colunas)}) VALUES ({", ".join(f"S.{c}" for c in colunas)})
+        ''').result()
+
+    if removidos:
+        job_config = bigquery.QueryJobConfig(query_parameters=[
+            bigquery.ArrayQueryParameter("ids", "STRING", removidos),
+        ])
+        bq_client.query(
+            f"DELETE FROM `{BIGQUERY_TABLE}` WHERE ListingID IN UNNEST(@ids)",
+            job_config=job_config,
+        ).result()
+
+def ingerir_feed(caminho_xml, pasta_saida, caminho_estado=None, delta=False, tamanho_lote=TAMANHO_LOTE, bigquery=False):
+    """Converte o feed VRSync em lotes NDJSON e, opcionalmente, carrega no BigQuery."""
+    estado_anterior = carregar_estado(caminho_estado) if delta else {}
+    estado_novo = {}
+    duplicados = []
+
+    linhas = filtrar_alterados(ler_listings(caminho_xml), estado_anterior, estado_novo, delta, duplicados)
+    arquivos, alterados = gravar_ndjson(linhas, pasta_saida, tamanho_lote)
+    removidos = [listing_id for listing_id in estado_anterior if listing_id not in estado_novo]
+    arquivo_removidos = gravar_removidos(removidos, pasta_saida)
+
+    # O MERGE do modo delta falha com ListingID repetido na staging: o feed é rejeitado antes da carga
+    if duplicados:
+        exemplos = ", ".join(sorted(set(duplicados))[:MAX_DUPLICADOS_EXIBIDOS])
+        raise ValueError(f"Feed com {len(duplicados)} ListingID(s) duplicado(s): {exemplos}")
+
+    if bigquery:
+        carregar_bigquery(arquivos, removidos, delta)
+
+    # O estado só avança depois que a carga terminou
+    if caminho_estado:
+        salvar_estado(caminho_estado, estado_novo)
+
+    print(f"✅ {len(estado_novo)} imóveis no feed, {alterados} gravados, {len(removidos)} removidos")
+    return {
+        "total": len(estado_novo),
+        "alterados": alterados,
+        "removidos": removidos,
+        "arquivos": arquivos,
+        "arquivo_removidos": arquivo_removidos,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Carrega um feed VRSync na tabela imoveis.listing")
+    parser.add_argument("xml", help="Arquivo do feed VRSync")
+    parser.add_argument("--saida", default="saida_listing", help="Pasta dos arquivos NDJSON")
+    parser.add_argument("--estado", help="Arquivo JSON com o hash de cada ListingID")
+    parser.add_argument("--delta", action="store_true", help="Grava apenas os imóveis alterados desde a última execução")
+    parser.add_argument("--lote", type=int, default=TAMANHO_LOTE, help="Imóveis por arquivo / load job")
+    parser.add_argument("--bigquery", action="store_true", help="Carrega os lotes no BigQuery")
+    args = parser.parse_args()
+
+    if args.delta and not args.estado:
+        parser.error("--delta exige --estado")
+
+    ingerir_feed(args.xml, args.saida, args.estado, args.delta, args.lote, args.bigquery)
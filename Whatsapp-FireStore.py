@@ -1,8 +1,15 @@
 import os
+import sys
+import json
 import time
+import random
+import threading
 import requests
 import functions_framework
+from collections import OrderedDict
+from contextlib import contextmanager
 from flask import request, jsonify
+from google.api_core.exceptions import AlreadyExists
 from google.cloud import firestore
 
 # Firestore Client Initialization
@@ -20,6 +27,64 @@ WHATSAPP_PHONE_NUMBER_ID = "598749756654857"
 # URL da API do WhatsApp
 WHATSAPP_API_URL = f"https://graph.facebook.com/v22.0/{WHATSAPP_PHONE_NUMBER_ID}/messages"
 
+# Deduplicação pelo message id do WhatsApp (reentregas da Meta)
+DEDUP_FIRESTORE = os.getenv("DEDUP_FIRESTORE", "0") == "1"
+TTL_DEDUP_SEGUNDOS = 24 * 60 * 60
+MAX_IDS_EM_MEMORIA = 50000
+
+# IDs já recebidos por esta instância (message_id -> horário)
+ids_recebidos = OrderedDict()
+ids_lock = threading.Lock()
+
+# Rastreamento: toda chamada externa é contada; uma fração TRACE_SAMPLE_RATE vira uma linha de log JSON
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.01"))
+
+# Estatísticas das chamadas externas: "dependencia.operacao" -> [chamadas, erros, total_ms, max_ms]
+_rastros = {}
+_rastros_lock = threading.Lock()
+
+@contextmanager
+def rastrear(operacao, esperadas=(), **campos):
+    """Mede uma chamada externa. Erros são sempre logados; o resto, por amostragem.
+
+    O bloco recebe `campos` e pode acrescentar informações (ex.: status HTTP).
+    Exceções em `esperadas` fazem parte do fluxo normal e não contam como erro.
+    """
+    inicio = time.perf_counter()
+    erro = None
+    try:
+        yield campos
+    except esperadas:
+        raise
+    except Exception as e:
+        erro = type(e).__name__
+        raise
+    finally:
+        duracao_ms = (time.perf_counter() - inicio) * 1000
+        with _rastros_lock:
+            estatisticas = _rastros.setdefault(operacao, [0, 0, 0.0, 0.0])
+            estatisticas[0] += 1
+            estatisticas[1] += erro is not None
+            estatisticas[2] += duracao_ms
+            estatisticas[3] = max(estatisticas[3], duracao_ms)
+        if erro or random.random() < TRACE_SAMPLE_RATE:
+            # Uma única escrita por linha, para não intercalar com outras threads
+            sys.stdout.write(json.dumps({
+                "severity": "ERROR" if erro else "INFO",
+                "operacao": operacao,
+                "duracao_ms": round(duracao_ms, 2),
+                "erro": erro,
+                **campos,
+            }, ensure_ascii=False, default=str) + "\n")
+
+def metricas_rastros():
+    """Resumo das chamadas externas feitas por esta instância."""
+    with _rastros_lock:
+        return {
+            operacao: {"chamadas": chamadas, "erros": erros, "media_ms": round(total / chamadas, 2), "max_ms": round(maximo, 2)}
+            for operacao, (chamadas, erros, total, maximo) in _rastros.items()
+        }
+
 @functions_framework.http
 def whatsapp_webhook(request):
     """Processa mensagens recebidas do WhatsApp e salva no Firestore"""
@@ -37,18 +102,24 @@ def whatsapp_webhook(request):
     if request.method == "POST":
         req_data = request.get_json()
 
-        if "entry" in req_data:
-            for entry in req_data["entry"]:
-                for change in entry["changes"]:
-                    if "messages" in change["value"]:
-                        for message in change["value"]["messages"]:
-                            sender_id = message["from"]
-                            user_message = message["text"]["body"]
-
-                            print(f"📩 Nova mensagem do usuário {sender_id}: {user_message}")
-
-                            # Salvar a mensagem no Firestore
-                            save_message_to_firestore(sender_id, user_message)
+        with rastrear("webhook.whatsapp", mensagens=0) as campos:
+            if "entry" in req_data:
+                for entry in req_data["entry"]:
+                    for change in entry["changes"]:
+                        if "messages" in change["value"]:
+                            for message in change["value"]["messages"]:
+                                campos["mensagens"] += 1
+                                if mensagem_ja_recebida(message.get("id")):
+                                    print(f"🔁 Mensagem {message.get('id')} já recebida. Ignorando reentrega.")
+                                    continue
+
+                                try:
+                                    # Salvar a mensagem no Firestore
+                                    save_message_to_firestore(message["from"], message["text"]["body"])
+                                except Exception:
+                                    # Sem a marca, a reentrega do WhatsApp (após o erro 500) é processada de novo
+                                    liberar_mensagem(message.get("id"))
+                                    raise
 
         return jsonify({"status": "ok"}), 200
 
@@ -64,6 +135,52 @@ def save_message_to_firestore(sender_id, message):
     }
 
     # Salva ou atualiza a coleção de mensagens com base no sender_id
-    user_reference.set(message_data, merge=True)
-
-    print(f"💾 Mensagem salva no Firestore para o usuário {sender_id}")
\ No newline at end of file
+    with rastrear("firestore.set", sessao=sender_id):
+        user_reference.set(message_data, merge=True)
+
+def mensagem_ja_recebida(message_id):
+    """Retorna True se o message id já foi recebido (cache local e, opcionalmente, Firestore).
+
+    Retornando False o id fica marcado; se o processamento falhar, a marca
+    deve ser desfeita com `liberar_mensagem`.
+    """
+    if not message_id:
+        return False
+
+    agora = time.time()
+    with ids_lock:
+        recebido_em = ids_recebidos.get(message_id)
+        if recebido_em is not None and agora - recebido_em < TTL_DEDUP_SEGUNDOS:
+            return True
+
+    if DEDUP_FIRESTORE:
+        # create() falha se outra instância já registrou o mesmo id; outros erros sobem sem deixar marca
+        try:
+            with rastrear("firestore.create", esperadas=AlreadyExists):
+                db.collection("mensagens_recebidas").document(message_id).create({"recebido_em": firestore.SERVER_TIMESTAMP})
+        except AlreadyExists:
+            return True
+
+    # A marca local só entra depois da do Firestore
+    with ids_lock:
+        ids_recebidos[message_id] = agora
+        ids_recebidos.move_to_end(message_id)
+        while len(ids_recebidos) > MAX_IDS_EM_MEMORIA:
+            ids_recebidos.popitem(last=False)
+
+    return False
+
+def liberar_mensagem(message_id):
+    """Desfaz a marca de `mensagem_ja_recebida` para que a reentrega seja processada."""
+    if not message_id:
+        return
+
+    with ids_lock:
+        ids_recebidos.pop(message_id, None)
+
+    if DEDUP_FIRESTORE:
+        try:
+            with rastrear("firestore.delete"):
+                db.collection("mensagens_recebidas").document(message_id).delete()
+        except Exception as e:
+            print(f"❌ Erro ao liberar a mensagem {message_id}: {e}")